@@ -1,23 +1,52 @@
 #!/usr/bin/env python3
 import argparse
-import json
 from collections import Counter, defaultdict
+import heapq
 from itertools import combinations
 import math
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-import networkx as nx
+try:
+    import numpy as np
+except ImportError:  # optional accelerator
+    np = None
+try:
+    from scipy import sparse
+except ImportError:  # optional accelerator
+    sparse = None
+try:
+    from numba import njit, prange
+except ImportError:  # optional accelerator
+    njit = None
+
+from graph_backend import (
+    betweenness_centrality,
+    build_csr,
+    build_igraph,
+    csr_in_degrees,
+    csr_reciprocal_pairs,
+    in_degrees,
+    strongly_connected_components,
+)
+from jsonio import dump_json, load_json
 
 
 def load_graph(path: str):
-    data = json.load(open(path, "r", encoding="utf-8"))
+    data = load_json(path)
+    nodes, edges = graph_from_data(data)
+    return data, nodes, edges
+
+
+def graph_from_data(data: Dict[str, Any]) -> Tuple[Set[str], List[Tuple[str, str]]]:
     # Keep only edges where target exists in dataset to avoid phantom nodes (optional)
     nodes = set(data.keys())
     edges = []
     for u, payload in data.items():
-        for v in payload.get("following", []):
+        # dict.fromkeys drops repeated targets (older crawls could list one twice)
+        for v in dict.fromkeys(payload.get("following", [])):
             if v in nodes:
                 edges.append((u, v))
-    return data, nodes, edges
+    return nodes, edges
 
 
 def jaccard(a: set, b: set) -> float:
@@ -28,90 +57,284 @@ def jaccard(a: set, b: set) -> float:
     return inter / uni if uni else 0.0
 
 
-def main():
-    ap = argparse.ArgumentParser(description="Analyze Bluesky follow graph for structure; output JSON.")
-    ap.add_argument("in_json", help="crawler output graph.json")
-    ap.add_argument("--min-shared", type=int, default=10, help="Min shared follow targets for co-follow edges")
-    ap.add_argument("--top", type=int, default=50, help="How many results per report section")
-    ap.add_argument("--approx-betweenness-k", type=int, default=200,
-                    help="Approx betweenness sample size (0 disables)")
-    ap.add_argument("--out", default="analysis.json", help="Output JSON report")
-    args = ap.parse_args()
+# If a target has huge follower list, combinations explode.
+# Cap to control worst-case blowups.
+MAX_FOLLOWERS_PER_TARGET = 5000
 
-    _, nodes, edges = load_graph(args.in_json)
+# Pending pair keys to buffer before folding them into the running counts
+PAIR_KEY_BATCH = 1 << 24
 
-    G = nx.DiGraph()
-    G.add_nodes_from(nodes)
-    G.add_edges_from(edges)
 
-    # Degree
-    in_deg = dict(G.in_degree())
-    out_deg = dict(G.out_degree())
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _pair_keys_jit(ptr, ids, weights, n):
+        # Targets are packed CSC-style: ids[ptr[t]:ptr[t + 1]] are target t's sorted follower ids.
+        # Each target writes its pairs into its own slice, so the prange loop needs no locking.
+        t_count = len(ptr) - 1
+        offsets = np.zeros(t_count + 1, dtype=np.int64)
+        for t in range(t_count):
+            f = ptr[t + 1] - ptr[t]
+            offsets[t + 1] = offsets[t] + f * (f - 1) // 2
+        keys = np.empty(offsets[t_count], dtype=np.int64)
+        w = np.empty(offsets[t_count], dtype=np.float64)
+        for t in prange(t_count):
+            o = offsets[t]
+            for i in range(ptr[t], ptr[t + 1]):
+                a = ids[i] * n
+                for j in range(i + 1, ptr[t + 1]):
+                    keys[o] = a + ids[j]
+                    w[o] = weights[t]
+                    o += 1
+        return keys, w
+else:
+    _pair_keys_jit = None
 
-    top_in = sorted(in_deg.items(), key=lambda x: x[1], reverse=True)[: args.top]
-    top_out = sorted(out_deg.items(), key=lambda x: x[1], reverse=True)[: args.top]
 
-    # Reciprocity pairs
-    reciprocals = []
-    seen = set()
-    for u, v in G.edges():
-        if (v, u) in G.edges() and (v, u) not in seen:
-            reciprocals.append((u, v))
-            seen.add((u, v))
-            seen.add((v, u))
+def _pair_key_counts(targets, idx: Dict[str, int]):
+    """
+    numpy co-follow counter: pair (a, b) of integer ids is keyed as a*N + b (a < b).
+    `targets` yields (followers, weight). Returns (keys, counts, scores) with keys sorted
+    ascending; scores sums the per-target weights. Pair keys come from the numba kernel
+    when numba is installed, else from np.triu_indices per target.
+    """
+    n = len(idx)
+    keys = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    scores = np.empty(0, dtype=np.float64)
 
-    # Rank reciprocals by "importance" (sum of in-degrees)
-    reciprocal_ranked = sorted(
-        [{"a": a, "b": b, "score": in_deg.get(a, 0) + in_deg.get(b, 0)} for a, b in reciprocals],
-        key=lambda x: x["score"],
-        reverse=True,
-    )[: args.top]
+    def reduce(pending):
+        # Sorted unique keys of one batch with their pair counts and summed weights
+        uniq, inverse = np.unique(np.concatenate([k for k, _ in pending]), return_inverse=True)
+        return (
+            uniq,
+            np.bincount(inverse, minlength=len(uniq)),
+            np.bincount(inverse, weights=np.concatenate([w for _, w in pending]), minlength=len(uniq)),
+        )
+
+    def fold(keys, counts, scores, pending):
+        # Merge a reduced batch into the running sorted arrays: keys already present are
+        # added in place, new ones are inserted at their searchsorted positions
+        bkeys, bcounts, bscores = reduce(pending)
+        pos = np.searchsorted(keys, bkeys)
+        hit = pos < len(keys)
+        hit[hit] = keys[pos[hit]] == bkeys[hit]
+        counts[pos[hit]] += bcounts[hit]
+        scores[pos[hit]] += bscores[hit]
+        new = ~hit
+        at = pos[new]
+        return (
+            np.insert(keys, at, bkeys[new]),
+            np.insert(counts, at, bcounts[new]),
+            np.insert(scores, at, bscores[new]),
+        )
+
+    def pair_keys(batch):
+        arrays = []
+        for followers, _ in batch:
+            arr = np.fromiter((idx[u] for u in followers), dtype=np.int64, count=len(followers))
+            arr.sort()
+            arrays.append(arr)
+        if _pair_keys_jit is not None:
+            ptr = np.zeros(len(arrays) + 1, dtype=np.int64)
+            np.cumsum([len(a) for a in arrays], out=ptr[1:])
+            weights = np.array([w for _, w in batch], dtype=np.float64)
+            return [_pair_keys_jit(ptr, np.concatenate(arrays), weights, n)]
+        pending = []
+        for arr, (_, w) in zip(arrays, batch):
+            i, j = np.triu_indices(len(arr), k=1)
+            pending.append((arr[i] * n + arr[j], np.full(len(i), w)))
+        return pending
+
+    batch = []
+    batch_size = 0
+    for followers, w in targets:
+        batch.append((followers, w))
+        batch_size += len(followers) * (len(followers) - 1) // 2
+        if batch_size >= PAIR_KEY_BATCH:
+            keys, counts, scores = fold(keys, counts, scores, pair_keys(batch))
+            batch, batch_size = [], 0
+
+    if batch:
+        keys, counts, scores = fold(keys, counts, scores, pair_keys(batch))
+    return keys, counts, scores
 
-    # Build following sets
-    following = {u: set(G.successors(u)) for u in nodes}
 
-    # Co-follow similarity using inverted index
+def shared_follow_counts(
+    following: Dict[str, Set[str]],
+    min_shared: int,
+    limit: int,
+    max_target_deg: int = 0,
+    idf_weight: bool = False,
+    csr=None,
+) -> List[Tuple[str, str, int, float]]:
+    """
+    Count shared follow targets for every follower pair (a < b) via an inverted index.
+    Targets with more than max_target_deg followers (hubs) are skipped; 0 keeps all.
+    With idf_weight each shared target adds 1/log(2 + its follower count) to the pair's score,
+    so co-following a niche account counts for more than co-following a mega-hub.
+    Returns up to `limit` (a, b, shared, score) tuples with shared >= min_shared, best score
+    first; score == shared unless idf_weight is set.
+    `csr` is an optional prebuilt (indptr, indices) of `following` over sorted names.
+    """
+    names = sorted(following)
+
+    if sparse is not None:
+        # Follower x target matrix F is the adjacency matrix with hub columns dropped and
+        # each column capped; F @ F.T counts shared targets per pair
+        indptr, indices = csr if csr is not None else build_csr(names, following)
+        n = len(names)
+        A = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr), shape=(n, n)).tocsc()
+        A.sort_indices()
+        deg = np.diff(A.indptr)  # followers per target
+        keep_col = deg >= 2
+        if max_target_deg:
+            keep_col &= deg <= max_target_deg
+        col_of = np.repeat(np.arange(n), deg)
+        pos = np.arange(len(A.indices)) - A.indptr[col_of]  # rank of follower within its column
+        keep = keep_col[col_of] & (pos < MAX_FOLLOWERS_PER_TARGET)
+        F = sparse.csr_matrix(
+            (A.data[keep], (A.indices[keep], col_of[keep])),
+            shape=(n, n),
+        )
+        C = sparse.triu(F @ F.T, k=1, format="csr")
+        C.sort_indices()
+        C = C.tocoo()
+        d = C.data
+        if idf_weight:
+            # Same sparsity pattern as C, so the canonical CSR data arrays line up
+            w = 1.0 / np.log(2 + deg)
+            S = sparse.triu(F.multiply(w[np.newaxis, :]).tocsr() @ F.T, k=1, format="csr")
+            S.sort_indices()
+            sc = S.tocoo().data
+        else:
+            sc = d
+        mask = d >= min_shared
+        r, c, d, sc = C.row[mask], C.col[mask], d[mask], sc[mask]
+        order = np.lexsort((c, r, -sc))[:limit]
+        return [(names[r[i]], names[c[i]], int(d[i]), float(sc[i])) for i in order]
+
     # target -> list of followers of target
     inv = defaultdict(list)
-    for u in nodes:
+    for u in names:
         for tgt in following[u]:
             inv[tgt].append(u)
+    idx = {n: i for i, n in enumerate(names)}
+
+    # (followers, weight) for every target that contributes pairs
+    targets = []
+    for followers in inv.values():
+        if len(followers) < 2 or (max_target_deg and len(followers) > max_target_deg):
+            continue
+        w = 1.0 / math.log(2 + len(followers)) if idf_weight else 1.0
+        targets.append((followers[:MAX_FOLLOWERS_PER_TARGET], w))
+
+    if np is not None:
+        # Integer ids instead of hashing DID/handle tuples for every pair
+        keys, counts, scores = _pair_key_counts(targets, idx)
+        mask = counts >= min_shared
+        keys, counts, scores = keys[mask], counts[mask], scores[mask]
+        order = np.lexsort((keys, -scores))[:limit]
+        pairs = []
+        for i in order:
+            a, b = divmod(int(keys[i]), len(names))
+            pairs.append((names[a], names[b], int(counts[i]), float(scores[i])))
+        return pairs
 
     # Count shared follows per pair without O(n^2) over nodes
     shared_counts = Counter()
-    for tgt, followers in inv.items():
-        if len(followers) < 2:
-            continue
-        # If a target has huge follower list, combinations explode.
-        # Cap to control worst-case blowups.
-        followers = followers[:5000]
+    shared_scores = Counter()
+    for followers, w in targets:
         for a, b in combinations(sorted(followers), 2):
             shared_counts[(a, b)] += 1
+            shared_scores[(a, b)] += w
 
-    # Filter and compute Jaccard for top pairs
+    pairs = ((a, b, c, shared_scores[(a, b)]) for (a, b), c in shared_counts.items() if c >= min_shared)
+    return heapq.nsmallest(limit, pairs, key=lambda x: (-x[3], x[0], x[1]))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Analyze Bluesky follow graph for structure; output JSON.")
+    ap.add_argument("in_json", help="crawler output graph.json")
+    ap.add_argument("--min-shared", type=int, default=10, help="Min shared follow targets for co-follow edges")
+    ap.add_argument("--top", type=int, default=50, help="How many results per report section")
+    ap.add_argument("--approx-betweenness-k", type=int, default=200,
+                    help="Approx betweenness sample size (0 disables)")
+    ap.add_argument("--max-target-deg", type=int, default=1000,
+                    help="Skip follow targets with more followers than this in co-follow counting (0 disables)")
+    ap.add_argument("--idf-weight", action="store_true",
+                    help="Rank co-follow pairs by a TF-IDF-like score: each shared target adds 1/log(2 + its followers)")
+    ap.add_argument("--out", default="analysis.json", help="Output JSON report")
+    return ap
+
+
+def run(args: argparse.Namespace, data: Optional[Dict[str, Any]] = None) -> int:
+    # data: crawl JSON already parsed by the caller (pipeline.py); read from args.in_json if None
+    if data is None:
+        data = load_json(args.in_json)
+
+    nodes, edges = graph_from_data(data)
+
+    # Following sets straight from the JSON, in name order
+    following = {u: set(data[u].get("following", [])) & nodes for u in sorted(data)}
+    names = list(following)
+
+    # Compact CSR copy (int32 indptr/indices over `names`) for the vectorized passes
+    csr = build_csr(names, following) if np is not None else None
+
+    # Degree
+    if csr is not None:
+        in_deg = dict(zip(names, csr_in_degrees(*csr).tolist()))
+        out_deg = dict(zip(names, np.diff(csr[0]).tolist()))
+    else:
+        in_deg = in_degrees(following)
+        out_deg = {u: len(vs) for u, vs in following.items()}
+
+    top_in = heapq.nlargest(args.top, in_deg.items(), key=lambda x: x[1])
+    top_out = heapq.nlargest(args.top, out_deg.items(), key=lambda x: x[1])
+
+    # Reciprocity pairs
+    # u < v keeps one orientation per pair
+    if csr is not None:
+        rows, cols = csr_reciprocal_pairs(*csr)
+        reciprocals = [(names[a], names[b]) for a, b in zip(rows.tolist(), cols.tolist())]
+    else:
+        reciprocals = [(u, v) for u, vs in following.items() for v in sorted(vs) if u < v and u in following[v]]
+
+    # Rank reciprocals by "importance" (sum of in-degrees)
+    reciprocal_ranked = heapq.nlargest(
+        args.top,
+        ({"a": a, "b": b, "score": in_deg.get(a, 0) + in_deg.get(b, 0)} for a, b in reciprocals),
+        key=lambda x: x["score"],
+    )
+
+    # Co-follow similarity, then Jaccard for top pairs
     cofollow = []
-    for (a, b), c in shared_counts.most_common():
-        if c < args.min_shared:
-            break
+    for a, b, c, score in shared_follow_counts(
+        following, args.min_shared, limit=args.top,
+        max_target_deg=args.max_target_deg, idf_weight=args.idf_weight, csr=csr,
+    ):
         ja = jaccard(following[a], following[b])
-        cofollow.append({"a": a, "b": b, "shared": c, "jaccard": ja})
-        if len(cofollow) >= args.top:
-            break
+        pair = {"a": a, "b": b, "shared": c, "jaccard": ja}
+        if args.idf_weight:
+            pair["score"] = score
+        cofollow.append(pair)
+
+    # One igraph copy for the betweenness and SCC passes (None without igraph)
+    g = build_igraph(names, edges)
 
     # Approx betweenness centrality (bridges)
     betweenness = {}
     if args.approx_betweenness_k > 0:
         k = min(args.approx_betweenness_k, len(nodes))
-        # networkx betweenness works on DiGraph; approximation uses k samples
-        betweenness = nx.betweenness_centrality(G, k=k, normalized=True, seed=1)
-    top_bridge = sorted(betweenness.items(), key=lambda x: x[1], reverse=True)[: args.top] if betweenness else []
+        # approximation uses k sampled sources; igraph when available, else pure Python
+        betweenness = betweenness_centrality(names, edges, k, seed=1, g=g)
+    top_bridge = heapq.nlargest(args.top, betweenness.items(), key=lambda x: x[1])
 
     # Strongly connected components (SCCs) - dense mutual-follow subgraphs
-    sccs = list(nx.strongly_connected_components(G))
-    sccs_sorted = sorted(sccs, key=len, reverse=True)
+    sccs = strongly_connected_components(names, edges, g=g)
     top_sccs = [
         {"size": len(comp), "nodes": sorted(list(comp))[:50]}
-        for comp in sccs_sorted[:10]
+        for comp in heapq.nlargest(10, sccs, key=len)
         if len(comp) > 1
     ]
 
@@ -129,12 +352,15 @@ def main():
         "top_strongly_connected_components": top_sccs,
     }
 
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
+    dump_json(report, args.out)
 
     return 0
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    return run(build_parser().parse_args(argv))
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
 
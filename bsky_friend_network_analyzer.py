@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import os
 import sys
 import time
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple
 
 from atproto import Client
 
+from jsonio import dumps_line, dumps_pretty, iter_ndjson
+
 
 def env_optional(name: str) -> Optional[str]:
     v = os.environ.get(name)
@@ -50,9 +52,10 @@ def get_all_follows(
 ) -> List[Dict[str, Any]]:
     """
     Fetch all accounts `actor` follows (app.bsky.graph.getFollows), handling cursor pagination.
-    Returns list of profile views.
+    Returns list of profile views, deduplicated by DID.
     """
     out: List[Dict[str, Any]] = []
+    seen: set[str] = set()  # accounts already returned; pages can overlap if follows change mid-crawl
     cursor: Optional[str] = None
 
     while True:
@@ -76,8 +79,13 @@ def get_all_follows(
 
         follows = page.get("follows", []) or []
         # Ensure dict form
-        follows = [as_dict(x) for x in follows]
-        out.extend(follows)
+        for x in follows:
+            fv = as_dict(x)
+            key = fv.get("did") or fv.get("handle") or ""
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(fv)
 
         if max_items is not None and len(out) >= max_items:
             return out[:max_items]
@@ -100,6 +108,12 @@ def main() -> int:
                     help="Optional cap on follows fetched per account (limits blast radius).")
     ap.add_argument("--pause", type=float, default=0.0,
                     help="Optional pause between page fetches (seconds). Helpful for rate limits.")
+    ap.add_argument("--concurrency", type=int, default=4,
+                    help="Accounts whose follows are fetched in parallel.")
+    ap.add_argument("--checkpoint", default=None,
+                    help="NDJSON file that records each account's follows as they are fetched; "
+                         "rerunning the same crawl with this file resumes without refetching them. "
+                         "Deleted once the crawl completes.")
     ap.add_argument("--auth", action="store_true",
                     help="Use auth from env (BSKY_HANDLE / BSKY_APP_PASSWORD). Not required for public data.")
     args = ap.parse_args()
@@ -107,6 +121,9 @@ def main() -> int:
     if args.depth < 0:
         print("depth must be >= 0", file=sys.stderr)
         return 2
+    if args.concurrency < 1:
+        print("concurrency must be >= 1", file=sys.stderr)
+        return 2
 
     client = Client()
     if args.auth:
@@ -157,19 +174,46 @@ def main() -> int:
 
     record_node(root_name, root_did, linked_from="")
 
-    # BFS queue items: (actor_name, actor_id, current_depth)
-    q = deque([(root_name, root_id, 0)])
-
-    while q:
-        actor_name, actor_id, d = q.popleft()
-        if d >= args.depth:
-            continue
-
-        # Safety cap
-        if args.max_accounts is not None and len(visited) >= args.max_accounts:
-            break
-
-        # Fetch who this actor follows
+    # Follows replayed from an interrupted run's checkpoint: actor_id -> [(name, did), ...].
+    # Live fetches are never stored here, and each entry is dropped once it is merged.
+    fetched: Dict[str, List[Tuple[str, str]]] = {}
+    checkpoint = None
+    if args.checkpoint:
+        # The first record names the crawl; a checkpoint from a different crawl is not reused
+        params = {
+            "root": root_id,
+            "depth": args.depth,
+            "max_follows_per_account": args.max_follows_per_account,
+        }
+        resume = False
+        if os.path.exists(args.checkpoint):
+            records = iter_ndjson(args.checkpoint)
+            header = next(records, None)
+            if header is not None and header.get("params") == params:
+                for rec in records:
+                    fetched[rec["actor"]] = [(nm, did) for nm, did in rec["follows"]]
+                resume = True
+                print(f"Resuming with {len(fetched)} accounts from {args.checkpoint}", file=sys.stderr)
+            elif header is not None:
+                print(f"{args.checkpoint} is from a different crawl; starting over", file=sys.stderr)
+            records.close()
+        if resume:
+            checkpoint = open(args.checkpoint, "ab")
+            # Terminate a torn last line so the next record starts clean
+            with open(args.checkpoint, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    checkpoint.write(b"\n")
+        else:
+            checkpoint = open(args.checkpoint, "wb")
+            checkpoint.write(dumps_line({"params": params}))
+            checkpoint.flush()
+
+    def fetch_follows(actor_name: str, actor_id: str) -> Tuple[List[Tuple[str, str]], bool]:
+        # Fetch who this actor follows, as (name, did); the flag is True when replayed from the checkpoint
+        cached = fetched.get(actor_id)
+        if cached is not None:
+            return cached, True
         follows_views = get_all_follows(
             client,
             actor_name if actor_name.startswith("did:") is False else actor_id,
@@ -177,30 +221,85 @@ def main() -> int:
             max_items=args.max_follows_per_account,
             min_pause_s=args.pause,
         )
+        return [normalize_actor_view(fv) for fv in follows_views], False
 
-        following_names: List[str] = []
-        for fv in follows_views:
-            nm, did = normalize_actor_view(fv)
-            follower_id = did or nm
-            following_names.append(nm)
-
-            # Record the node and edge
-            record_node(nm, did, linked_from=actor_name)
-
-            # Dedupe + enqueue
-            if follower_id not in visited:
-                if args.max_accounts is not None and len(visited) >= args.max_accounts:
-                    break
-                visited.add(follower_id)
-                name_by_id[follower_id] = nm
-                id_by_name[nm] = follower_id
-                q.append((nm, follower_id, d + 1))
-
-        graph[actor_name]["following"] = following_names
-
-    # JSON only to stdout
-    json.dump(graph, sys.stdout, indent=2, sort_keys=True)
-    sys.stdout.write("\n")
+    def cap_reached() -> bool:
+        return args.max_accounts is not None and len(visited) >= args.max_accounts
+
+    # Layer-by-layer BFS. Up to --concurrency fetches run ahead of the merge in a sliding
+    # window; results are merged on this thread in frontier order, so the output matches
+    # a serial crawl.
+    frontier: List[Tuple[str, str]] = [(root_name, root_id)]  # (actor_name, actor_id)
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+            for d in range(args.depth):
+                next_frontier: List[Tuple[str, str]] = []
+                pending = deque()  # futures for frontier[submitted - len(pending):submitted]
+                submitted = 0
+                try:
+                    for actor_name, actor_id in frontier:
+                        # Safety cap
+                        if cap_reached():
+                            break
+                        while submitted < len(frontier) and len(pending) < args.concurrency:
+                            pending.append(ex.submit(fetch_follows, *frontier[submitted]))
+                            submitted += 1
+                        follows, cached = pending.popleft().result()
+
+                        if cached:
+                            # Already in the checkpoint; free the replayed record
+                            del fetched[actor_id]
+                        elif checkpoint is not None:
+                            # Checkpoint every new fetch so a restart can skip it
+                            checkpoint.write(dumps_line({"actor": actor_id, "follows": follows}))
+                            checkpoint.flush()
+
+                        following_names: set[str] = set()
+                        for nm, did in follows:
+                            follower_id = did or nm
+                            following_names.add(nm)
+
+                            # Record the node and edge
+                            record_node(nm, did, linked_from=actor_name)
+
+                            # Dedupe + enqueue
+                            if follower_id not in visited:
+                                if cap_reached():
+                                    break
+                                visited.add(follower_id)
+                                name_by_id[follower_id] = nm
+                                id_by_name[nm] = follower_id
+                                next_frontier.append((nm, follower_id))
+
+                        graph[actor_name]["following"] = sorted(following_names)
+                finally:
+                    # Cap hit or a failed fetch: drop fetches that have not started yet, so
+                    # leaving the executor does not wait on the rest of the window
+                    for fut in pending:
+                        fut.cancel()
+                frontier = next_frontier
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    # JSON only to stdout. Sort the top level once and lay out each node's keys in order
+    # (following lists are already sorted) instead of a recursive sort_keys pass.
+    out = {
+        name: {
+            "did": node.get("did", ""),
+            "following": node["following"],
+            "linked_from": node.get("linked_from", ""),
+        }
+        for name, node in sorted(graph.items())
+    }
+    sys.stdout.flush()
+    sys.stdout.buffer.write(dumps_pretty(out))
+    sys.stdout.buffer.write(b"\n")
+    sys.stdout.flush()
+
+    # Crawl finished; the checkpoint is only needed to resume an interrupted run
+    if args.checkpoint:
+        os.remove(args.checkpoint)
     return 0
 
 
@@ -1,21 +1,27 @@
 
 #!/usr/bin/env python3
 import argparse
-import json
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+import heapq
 from typing import Dict, List, Set, Tuple, Any, Optional
 
-import networkx as nx
+from graph_backend import betweenness_centrality, in_degrees
+from json_to_processing_xml import write_graph_xml
+from jsonio import dump_json, load_json
 
 
 def load_crawler_json(path: str, keep_external_targets: bool) -> Tuple[Dict[str, Any], Set[str], List[Tuple[str, str]]]:
-    data = json.load(open(path, "r", encoding="utf-8"))
+    data = load_json(path)
+    nodes, edges = crawler_graph(data, keep_external_targets)
+    return data, nodes, edges
+
 
+def crawler_graph(data: Dict[str, Any], keep_external_targets: bool) -> Tuple[Set[str], List[Tuple[str, str]]]:
     nodes = set(data.keys())
     edges: List[Tuple[str, str]] = []
 
     for u, payload in data.items():
-        for v in (payload.get("following") or []):
+        for v in dict.fromkeys(payload.get("following") or []):
             if keep_external_targets:
                 nodes.add(v)
                 edges.append((u, v))
@@ -23,46 +29,43 @@ def load_crawler_json(path: str, keep_external_targets: bool) -> Tuple[Dict[str,
                 if v in nodes:
                     edges.append((u, v))
 
-    return data, nodes, edges
+    return nodes, edges
 
 
-def build_digraph(nodes: Set[str], edges: List[Tuple[str, str]]) -> nx.DiGraph:
-    G = nx.DiGraph()
-    G.add_nodes_from(nodes)
-    G.add_edges_from(edges)
-    return G
+def build_adjacency(nodes: Set[str], edges: List[Tuple[str, str]]) -> Dict[str, Set[str]]:
+    # Successor sets for every node; plain dicts are all the filtering passes need
+    succ: Dict[str, Set[str]] = {n: set() for n in sorted(nodes)}
+    for u, v in edges:
+        succ[u].add(v)
+    return succ
 
 
-def get_reciprocal_edges(G: nx.DiGraph) -> Set[Tuple[str, str]]:
-    # Return directed edges that are part of a mutual pair (u->v and v->u)
-    recip = set()
-    for u, v in G.edges():
-        if G.has_edge(v, u):
-            recip.add((u, v))
-    return recip
+def get_reciprocal_edges(succ: Dict[str, Set[str]]) -> Set[Tuple[str, str]]:
+    # Return mutual pairs (u->v and v->u) once each, as canonical (min, max) tuples
+    return {(u, v) for u, nbrs in succ.items() for v in nbrs if u < v and u in succ[v]}
 
 
 def topk(items: List[Tuple[str, float]], k: int) -> List[str]:
-    return [n for n, _ in sorted(items, key=lambda x: x[1], reverse=True)[:k]]
+    return [n for n, _ in heapq.nlargest(k, items, key=lambda x: x[1])]
 
 
-def induced_edge_cap(G: nx.DiGraph, keep_nodes: Set[str], max_edges: int) -> List[Tuple[str, str]]:
+def induced_edge_cap(succ: Dict[str, Set[str]], keep_nodes: Set[str], max_edges: int) -> List[Tuple[str, str]]:
     """
     Build an edge list restricted to keep_nodes, capped by max_edges using a score:
       score = in_degree(target) + in_degree(source) + 3*(reciprocal)
     Keeps highest-score edges first.
+    Works on the adjacency sets directly instead of copying the induced subgraph.
     """
-    sub = G.subgraph(keep_nodes).copy()
-    indeg = dict(sub.in_degree())
-    recip = get_reciprocal_edges(sub)
-
-    scored = []
-    for u, v in sub.edges():
-        score = indeg.get(u, 0) + indeg.get(v, 0) + (3 if (u, v) in recip else 0)
-        scored.append((score, u, v))
-
-    scored.sort(reverse=True, key=lambda x: x[0])
-    scored = scored[:max_edges]
+    # In-degree within the induced subgraph
+    indeg = Counter(v for u in keep_nodes for v in succ[u] if v in keep_nodes)
+
+    scored = (
+        (indeg[u] + indeg[v] + (3 if u in succ[v] else 0), u, v)
+        for u in keep_nodes
+        for v in succ[u]
+        if v in keep_nodes
+    )
+    scored = heapq.nlargest(max_edges, scored, key=lambda x: x[0])
     return [(u, v) for _, u, v in scored]
 
 
@@ -79,20 +82,23 @@ def adjacency_json_from_edges(
     # else blank for all.
     linked_from = {n: "" for n in nodes}
     if root and root in nodes:
-        q = [root]
+        q = deque([root])
         seen = {root}
         while q:
-            u = q.pop(0)
+            u = q.popleft()
             for v in following.get(u, []):
                 if v not in seen:
                     seen.add(v)
                     linked_from[v] = u
                     q.append(v)
 
+    # Sort each list once rather than per lookup in the emit loop
+    following = {u: sorted(vs) for u, vs in following.items()}
+
     out = {}
     for n in nodes:
         out[n] = {
-            "following": sorted(following.get(n, [])),
+            "following": following.get(n, []),
             "linked_from": linked_from.get(n, ""),
         }
     return out
@@ -101,22 +107,10 @@ def adjacency_json_from_edges(
 def write_processing_xml(nodes: Set[str], edges: List[Tuple[str, str]], out_xml: str) -> None:
     # Minimal Processing-compatible XML:
     # <graph><node id="..."/><edge source="..." target="..."/></graph>
-    import xml.etree.ElementTree as ET
-    from xml.dom import minidom
+    write_graph_xml(out_xml, sorted(nodes), edges)
 
-    root = ET.Element("graph")
-    for n in sorted(nodes):
-        ET.SubElement(root, "node", {"id": n})
-    for u, v in edges:
-        ET.SubElement(root, "edge", {"source": u, "target": v})
-
-    rough = ET.tostring(root, encoding="utf-8")
-    pretty = minidom.parseString(rough).toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
-    with open(out_xml, "w", encoding="utf-8") as f:
-        f.write(pretty)
 
-
-def main() -> int:
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="Filter a large Bluesky follow graph into a manageable backbone subgraph.")
     ap.add_argument("in_json", help="Input crawl output graph.json")
     ap.add_argument("--root", default=None, help="Root node id/handle (optional, for linked_from BFS)")
@@ -137,39 +131,36 @@ def main() -> int:
                     help="Hard cap on edges in output (keeps highest-scoring edges).")
     ap.add_argument("--out-json", default="filtered_graph.json", help="Output filtered adjacency JSON.")
     ap.add_argument("--out-xml", default=None, help="Optional Processing XML output path.")
-    args = ap.parse_args()
+    return ap
+
 
-    raw, nodes, edges = load_crawler_json(args.in_json, keep_external_targets=args.keep_external_targets)
-    G = build_digraph(nodes, edges)
+def run(args: argparse.Namespace, data: Optional[Dict[str, Any]] = None) -> int:
+    # pipeline.py hands over the crawl JSON it already parsed
+    if data is None:
+        data = load_json(args.in_json)
 
-    indeg = dict(G.in_degree())
-    outdeg = dict(G.out_degree())
+    nodes, edges = crawler_graph(data, keep_external_targets=args.keep_external_targets)
+    succ = build_adjacency(nodes, edges)
+
+    indeg = in_degrees(succ)
+    outdeg = {u: len(vs) for u, vs in succ.items()}
 
     # 1) top in-degree (hubs)
-    hubs = set(topk([(n, float(indeg.get(n, 0))) for n in G.nodes()], args.top_in))
+    hubs = set(topk([(n, float(indeg.get(n, 0))) for n in succ], args.top_in))
 
     # 2) approximate betweenness (bridges)
     bridges = set()
     btw = {}
-    if args.betweenness_k > 0 and args.top_bridge > 0 and G.number_of_nodes() > 0:
-        k = min(args.betweenness_k, G.number_of_nodes())
-        btw = nx.betweenness_centrality(G, k=k, normalized=True, seed=1)
-        bridges = set(topk([(n, float(btw.get(n, 0.0))) for n in G.nodes()], args.top_bridge))
+    if args.betweenness_k > 0 and args.top_bridge > 0 and succ:
+        k = min(args.betweenness_k, len(succ))
+        btw = betweenness_centrality(list(succ), edges, k, seed=1)
+        bridges = set(topk([(n, float(btw.get(n, 0.0))) for n in succ], args.top_bridge))
 
     # 3) reciprocal pair endpoints
-    recip_edges = get_reciprocal_edges(G)
-    # rank mutual pairs by combined in-degree; store undirected pairs once
-    seen_pairs = set()
-    pair_scores = []
-    for u, v in recip_edges:
-        a, b = (u, v) if u <= v else (v, u)
-        if (a, b) in seen_pairs:
-            continue
-        seen_pairs.add((a, b))
-        score = indeg.get(a, 0) + indeg.get(b, 0)
-        pair_scores.append((score, a, b))
-    pair_scores.sort(reverse=True, key=lambda x: x[0])
-    top_pairs = pair_scores[: args.keep_reciprocal_pairs]
+    recip_pairs = get_reciprocal_edges(succ)
+    # rank mutual pairs by combined in-degree
+    pair_scores = [(indeg.get(a, 0) + indeg.get(b, 0), a, b) for a, b in recip_pairs]
+    top_pairs = heapq.nlargest(args.keep_reciprocal_pairs, pair_scores, key=lambda x: x[0])
     reciprocal_nodes = set()
     for _, a, b in top_pairs:
         reciprocal_nodes.add(a)
@@ -177,15 +168,19 @@ def main() -> int:
 
     # 4) ego network around root (optional)
     ego = set()
-    if args.root and args.ego_hops > 0 and args.root in G:
-        # use undirected neighborhood for “graph shape”
-        UG = G.to_undirected()
+    if args.root and args.ego_hops > 0 and args.root in succ:
+        # use undirected neighborhood (successors + predecessors) for “graph shape”
+        pred = defaultdict(set)
+        for u, vs in succ.items():
+            for v in vs:
+                pred[v].add(u)
         ego.add(args.root)
         frontier = {args.root}
         for _ in range(args.ego_hops):
             nxt = set()
             for u in frontier:
-                nxt |= set(UG.neighbors(u))
+                nxt |= succ[u]
+                nxt |= pred[u]
             ego |= nxt
             frontier = nxt
 
@@ -194,7 +189,7 @@ def main() -> int:
     keep |= bridges
     keep |= reciprocal_nodes
     keep |= ego
-    if args.root and args.root in G:
+    if args.root and args.root in succ:
         keep.add(args.root)
 
     # Priority trim if too many nodes
@@ -213,15 +208,14 @@ def main() -> int:
                 p += 1e9
             return p
 
-        keep = set(sorted(list(keep), key=priority, reverse=True)[: args.max_nodes])
+        keep = set(heapq.nlargest(args.max_nodes, keep, key=priority))
 
     # Edge cap inside induced subgraph
-    kept_edges = induced_edge_cap(G, keep, args.max_edges)
+    kept_edges = induced_edge_cap(succ, keep, args.max_edges)
 
     # Emit filtered adjacency JSON (same schema as your crawler)
     out = adjacency_json_from_edges(keep, kept_edges, root=args.root)
-    with open(args.out_json, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2, sort_keys=True)
+    dump_json(out, args.out_json, sort_keys=True)
 
     if args.out_xml:
         write_processing_xml(keep, kept_edges, args.out_xml)
@@ -229,5 +223,9 @@ def main() -> int:
     return 0
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    return run(build_parser().parse_args(argv))
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
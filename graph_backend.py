@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Graph algorithms shared by analyze_graph.py and filter_graph.py.
+
+Uses python-igraph (C core) when it is installed and falls back to pure Python otherwise.
+The CSR helpers need numpy.
+"""
+import random
+from typing import Dict, List, Sequence, Set, Tuple
+
+try:
+    import igraph as ig
+except ImportError:  # optional accelerator
+    ig = None
+try:
+    import numpy as np
+except ImportError:  # optional accelerator
+    np = None
+
+
+def in_degrees(succ: Dict[str, Set[str]]) -> Dict[str, int]:
+    indeg = dict.fromkeys(succ, 0)
+    for vs in succ.values():
+        for v in vs:
+            indeg[v] += 1
+    return indeg
+
+
+def build_csr(names: Sequence[str], following: Dict[str, Set[str]]):
+    """
+    Compact CSR adjacency: row i lists the sorted column ids of the accounts names[i] follows.
+    Targets outside `names` are dropped. Returns (indptr, indices) as int32 arrays.
+    """
+    idx = {n: i for i, n in enumerate(names)}
+    indptr = np.zeros(len(names) + 1, dtype=np.int32)
+    indices: List[int] = []
+    for i, n in enumerate(names):
+        row = sorted(idx[v] for v in following.get(n, ()) if v in idx)
+        indices.extend(row)
+        indptr[i + 1] = len(indices)
+    return indptr, np.array(indices, dtype=np.int32)
+
+
+def csr_in_degrees(indptr, indices):
+    return np.bincount(indices, minlength=len(indptr) - 1)
+
+
+def csr_reciprocal_pairs(indptr, indices):
+    """
+    Mutual pairs as (rows, cols) id arrays with row < col.
+    An edge u->v is mutual when the key of v->u is also in the (sorted) edge key set.
+    """
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    cols = indices.astype(np.int64)
+    keys = rows * n + cols  # already sorted: rows ascending, columns sorted within a row
+    fwd = rows < cols
+    rev = cols[fwd] * n + rows[fwd]
+    pos = np.minimum(np.searchsorted(keys, rev), len(keys) - 1)
+    mutual = keys[pos] == rev
+    return rows[fwd][mutual], cols[fwd][mutual]
+
+
+def build_igraph(nodes: Sequence[str], edges: List[Tuple[str, str]]):
+    # Integer-indexed copy of the graph; vertex i is nodes[i]. None without igraph.
+    if ig is None:
+        return None
+    idx = {n: i for i, n in enumerate(nodes)}
+    return ig.Graph(n=len(nodes), edges=[(idx[u], idx[v]) for u, v in edges], directed=True)
+
+
+def _index_adjacency(nodes: Sequence[str], edges: List[Tuple[str, str]]) -> Tuple[List[List[int]], List[List[int]]]:
+    # Successor and predecessor lists indexed by position in nodes
+    idx = {u: i for i, u in enumerate(nodes)}
+    succ: List[List[int]] = [[] for _ in nodes]
+    pred: List[List[int]] = [[] for _ in nodes]
+    for u, v in edges:
+        succ[idx[u]].append(idx[v])
+        pred[idx[v]].append(idx[u])
+    return succ, pred
+
+
+def _partial_betweenness(succ: List[List[int]], pred: List[List[int]], sources: Sequence[int]) -> List[float]:
+    """
+    Brandes BFS + dependency accumulation for the given sources, over list-indexed adjacency.
+    Predecessors on shortest paths are recovered from `pred` by distance, so no per-source
+    predecessor lists are allocated.
+    """
+    n = len(succ)
+    bc = [0.0] * n
+    for s in sources:
+        dist = [-1] * n
+        sigma = [0] * n
+        dist[s] = 0
+        sigma[s] = 1
+        order = [s]  # BFS order; doubles as the queue
+        i = 0
+        while i < len(order):
+            v = order[i]
+            i += 1
+            dw = dist[v] + 1
+            sv = sigma[v]
+            for w in succ[v]:
+                if dist[w] < 0:
+                    dist[w] = dw
+                    order.append(w)
+                if dist[w] == dw:
+                    sigma[w] += sv
+
+        delta = [0.0] * n
+        for w in reversed(order[1:]):
+            dv = dist[w] - 1
+            coeff = (1.0 + delta[w]) / sigma[w]
+            for v in pred[w]:
+                if dist[v] == dv:
+                    delta[v] += sigma[v] * coeff
+            bc[w] += delta[w]
+    return bc
+
+
+def betweenness_centrality(
+    nodes: Sequence[str],
+    edges: List[Tuple[str, str]],
+    k: int,
+    seed: int = 1,
+    chunk_size: int = 32,
+    g=None,
+) -> Dict[str, float]:
+    """
+    Approximate normalized betweenness from k sampled sources (exact when k >= len(nodes)).
+    g is an optional prebuilt build_igraph(nodes, edges), so callers can share one copy.
+    Without igraph, sources are processed in batches of chunk_size and summed into one list.
+    """
+    nodes = list(nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    k = min(k, n)
+    sources = random.Random(seed).sample(range(n), k) if k < n else list(range(n))
+
+    if ig is None:
+        succ, pred = _index_adjacency(nodes, edges)
+        raw = [0.0] * n
+        for start in range(0, k, chunk_size):
+            partial = _partial_betweenness(succ, pred, sources[start:start + chunk_size])
+            for i, b in enumerate(partial):
+                raw[i] += b
+    else:
+        if g is None:
+            g = build_igraph(nodes, edges)
+        raw = g.betweenness(directed=True, sources=sources if k < n else None)
+
+    # Same scaling as NetworkX: normalize by (n-1)(n-2) ordered pairs, extrapolate samples by n/k
+    scale = 1.0 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+    scale *= n / k
+    return {nodes[i]: b * scale for i, b in enumerate(raw)}
+
+
+def _tarjan_scc(succ: List[List[int]]) -> List[List[int]]:
+    # Iterative Tarjan over list-indexed adjacency (no recursion limit on long chains)
+    n = len(succ)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    comps: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            v, i = work[-1]
+            nbrs = succ[v]
+            if i < len(nbrs):
+                work[-1] = (v, i + 1)
+                w = nbrs[i]
+                if index[w] < 0:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, 0))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                if low[v] < low[u]:
+                    low[u] = low[v]
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == v:
+                        break
+                comps.append(comp)
+    return comps
+
+
+def strongly_connected_components(nodes: Sequence[str], edges: List[Tuple[str, str]], g=None) -> List[Set[str]]:
+    # g: optional prebuilt build_igraph(nodes, edges), as in betweenness_centrality
+    nodes = list(nodes)
+    if ig is None:
+        succ, _ = _index_adjacency(nodes, edges)
+        comps = _tarjan_scc(succ)
+    else:
+        if g is None:
+            g = build_igraph(nodes, edges)
+        comps = g.connected_components(mode="strong")
+    return [{nodes[i] for i in comp} for comp in comps]
@@ -1,26 +1,31 @@
 #!/usr/bin/env python3
 import argparse
-import json
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
 
-def prettify(elem: ET.Element) -> str:
-    rough = ET.tostring(elem, encoding="utf-8")
-    reparsed = minidom.parseString(rough)
-    return reparsed.toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
+from jsonio import load_json
 
-def main() -> int:
+def write_graph_xml(out_xml: str, node_ids: Iterable[str], edges: Iterable[Tuple[str, str]]) -> None:
+    # Written line by line; same layout as minidom's toprettyxml(indent="  ")
+    parts = ['<?xml version="1.0" encoding="utf-8"?>\n<graph>\n']
+    parts += [f"  <node id={quoteattr(n)}/>\n" for n in node_ids]
+    parts += [f"  <edge source={quoteattr(u)} target={quoteattr(v)}/>\n" for u, v in edges]
+    parts.append("</graph>\n")
+    with open(out_xml, "w", encoding="utf-8") as f:
+        f.writelines(parts)
+
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="Convert crawler JSON to Processing XML (graph/node + graph/edge).")
     ap.add_argument("in_json", help="Input JSON from crawler (graph.json)")
     ap.add_argument("out_xml", help="Output XML for Processing (graph.xml)")
     ap.add_argument("--include-external-nodes", action="store_true",
                     help="If an edge points to a node not present as a key in JSON, include it as a node anyway.")
     ap.add_argument("--dedupe-edges", action="store_true", help="Remove duplicate edges.")
-    args = ap.parse_args()
-
-    data = json.load(open(args.in_json, "r", encoding="utf-8"))
+    return ap
 
-    root = ET.Element("graph")
+def run(args: argparse.Namespace, data: Optional[Dict[str, Any]] = None) -> int:
+    if data is None:
+        data = load_json(args.in_json)
 
     # Node set
     node_ids = set(data.keys())
@@ -29,29 +34,27 @@ def main() -> int:
             for tgt in (payload.get("following") or []):
                 node_ids.add(tgt)
 
-    # Emit nodes
-    for node_id in sorted(node_ids):
-        ET.SubElement(root, "node", {"id": node_id})
-
-    # Emit edges
-    seen = set()
-    for src, payload in data.items():
-        for tgt in (payload.get("following") or []):
-            if (not args.include_external_nodes) and (tgt not in node_ids):
-                continue
-            edge = (src, tgt)
-            if args.dedupe_edges:
-                if edge in seen:
+    # Edges
+    def iter_edges():
+        seen = set()
+        for src, payload in data.items():
+            for tgt in (payload.get("following") or []):
+                if (not args.include_external_nodes) and (tgt not in node_ids):
                     continue
-                seen.add(edge)
-            ET.SubElement(root, "edge", {"source": src, "target": tgt})
+                edge = (src, tgt)
+                if args.dedupe_edges:
+                    if edge in seen:
+                        continue
+                    seen.add(edge)
+                yield edge
 
-    xml_str = prettify(root)
-    with open(args.out_xml, "w", encoding="utf-8") as f:
-        f.write(xml_str)
+    write_graph_xml(args.out_xml, sorted(node_ids), iter_edges())
 
     return 0
 
+def main(argv: Optional[List[str]] = None) -> int:
+    return run(build_parser().parse_args(argv))
+
 if __name__ == "__main__":
     raise SystemExit(main())
 
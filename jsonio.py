@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+JSON read/write helpers: orjson when installed, stdlib json otherwise.
+"""
+import json
+from typing import Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
+
+
+def load_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps_pretty(obj: Any, *, sort_keys: bool = False) -> bytes:
+    # Pretty-printed with 2-space indent, like json.dump(..., indent=2)
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2, sort_keys=sort_keys).encode("utf-8")
+
+
+def dump_json(obj: Any, path: str, *, sort_keys: bool = False) -> None:
+    with open(path, "wb") as f:
+        f.write(dumps_pretty(obj, sort_keys=sort_keys))
+
+
+def dumps_line(obj: Any) -> bytes:
+    # One compact JSON document plus newline, for NDJSON files opened in binary mode
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def iter_ndjson(path: str) -> Iterator[Any]:
+    # Yields each record; a torn final line (crash mid-write) is skipped
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
@@ -4,11 +4,20 @@ import argparse
 import subprocess
 import sys
 from pathlib import Path
+from types import ModuleType
 
+import analyze_graph
+import filter_graph
+import json_to_processing_xml
+from jsonio import load_json
 
-def run(cmd: list[str]) -> None:
-    print("+", " ".join(cmd), file=sys.stderr)
-    subprocess.run(cmd, check=True)
+
+def run_stage(module: ModuleType, argv: list[str], data: dict) -> None:
+    # In-process: reuses this interpreter's imports and the already-parsed graph.json
+    print("+", module.__name__, " ".join(argv), file=sys.stderr)
+    rc = module.run(module.build_parser().parse_args(argv), data=data)
+    if rc:
+        raise SystemExit(rc)
 
 
 def main() -> int:
@@ -35,6 +44,7 @@ def main() -> int:
     out_dir.mkdir(parents=True, exist_ok=True)
 
     graph_json = out_dir / "graph.json"
+    crawl_checkpoint = out_dir / "graph.ndjson"
     markov_xml = out_dir / "markov_chain.xml"
     analysis_json = out_dir / "analysis.json"
     filtered_json = out_dir / "filtered_graph.json"
@@ -46,6 +56,8 @@ def main() -> int:
         args.actor,
         "--depth", str(args.depth),
         "--max-accounts", str(args.max_accounts),
+        # rerunning the pipeline after a crash resumes the crawl from here
+        "--checkpoint", str(crawl_checkpoint),
     ]
     if args.auth:
         crawl_cmd.append("--auth")
@@ -55,20 +67,23 @@ def main() -> int:
     with open(graph_json, "w", encoding="utf-8") as f:
         subprocess.run(crawl_cmd, stdout=f, check=True)
 
+    # Parse the crawl once; the remaining stages share it
+    data = load_json(str(graph_json))
+
     # 2) JSON -> Processing XML (raw)
-    run([sys.executable, "json_to_processing_xml.py", str(graph_json), str(markov_xml),
-         "--dedupe-edges", "--include-external-nodes"])
+    run_stage(json_to_processing_xml, [str(graph_json), str(markov_xml),
+              "--dedupe-edges", "--include-external-nodes"], data)
 
     # 3) Analyze
-    run([sys.executable, "analyze_graph.py", str(graph_json),
-         "--min-shared", str(args.min_shared),
-         "--top", str(args.top),
-         "--approx-betweenness-k", str(args.betweenness_k),
-         "--out", str(analysis_json)])
+    run_stage(analyze_graph, [str(graph_json),
+              "--min-shared", str(args.min_shared),
+              "--top", str(args.top),
+              "--approx-betweenness-k", str(args.betweenness_k),
+              "--out", str(analysis_json)], data)
 
     # 4) Filter backbone + Processing XML (filtered)
-    run([
-        sys.executable, "filter_graph.py", str(graph_json),
+    run_stage(filter_graph, [
+        str(graph_json),
         "--root", args.actor,
         "--ego-hops", str(args.ego_hops),
         "--top-in", str(args.top_in),
@@ -78,7 +93,7 @@ def main() -> int:
         "--max-edges", str(args.max_edges),
         "--out-json", str(filtered_json),
         "--out-xml", str(filtered_xml),
-    ])
+    ], data)
 
     print(f"\nOutputs in: {out_dir}", file=sys.stderr)
     print(f"- {graph_json}", file=sys.stderr)